@@ -22,7 +22,11 @@ from docker.models.containers import Container
 from docker.types import DeviceRequest
 
 from ._cancellation_token import CancellationToken
-from ._func_with_reqs import FunctionWithRequirements, FunctionWithRequirementsStr, build_python_functions_file
+from ._func_with_reqs import (
+    FunctionWithRequirements,
+    FunctionWithRequirementsStr,
+    build_python_functions_file_contents,
+)
 from ._types import CodeBlock, CommandLineCodeResult
 from ._utils import get_file_name_from_content, lang_to_cmd, silence_pip
 
@@ -198,9 +202,10 @@ $functions"""
         return self._timeout
 
     async def _setup_functions(self, cancellation_token: CancellationToken) -> None:
-        func_file_content = build_python_functions_file(self._functions)
+        # Text and bytes come from the same build, the text is used to validate the file in the container
+        func_file_content, func_file_bytes = build_python_functions_file_contents(self._functions)
         func_file = self.work_dir / f"{self._functions_module}.py"
-        func_file.write_text(func_file_content)
+        func_file.write_bytes(func_file_bytes)
 
         # Collect requirements
         lists_of_packages = [x.python_packages for x in self._functions if isinstance(x, FunctionWithRequirements)]
@@ -5,13 +5,14 @@ from __future__ import annotations
 
 import functools
 import inspect
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable
 from dataclasses import dataclass, field
-from importlib.abc import SourceLoader
-from importlib.util import module_from_spec, spec_from_loader
 from textwrap import dedent, indent
-from typing import Any, Callable, Generic, Sequence, Set, TypeVar, Union
-
-from typing_extensions import ParamSpec
+from types import CodeType
+from typing import Any, Callable, Dict, Generic, Optional, ParamSpec, Sequence, Tuple, TypeVar, Union
+from weakref import WeakKeyDictionary
 
 from ._types import Alias, Import
 
@@ -19,17 +20,55 @@ T = TypeVar("T")
 P = ParamSpec("P")
 
 
+def _strip_decorator(code: str) -> str:
+    if not code.startswith("@"):
+        return code
+    # Skip every line up to the definition so stacked and multi-line decorators are removed as well
+    lines = code.splitlines(keepends=True)
+    for i, line in enumerate(lines):
+        if line.startswith(("def ", "async def ", "class ")):
+            return "".join(lines[i:])
+    # No definition line found, still drop the leading decorator lines
+    i = 0
+    while i < len(lines) and lines[i].startswith("@"):
+        i += 1
+    return "".join(lines[i:])
+
+
+# Decorator-stripped source per function object. Code objects can not be used as the key since
+# they compare by value and ignore the filename, defaults and annotations, so distinct functions
+# would share an entry. Functions are held weakly so redefined ones can still be collected.
+_SOURCE_CACHE: WeakKeyDictionary[Callable[..., Any], str] = WeakKeyDictionary()
+
+
+def _stripped_source(func: Callable[..., Any]) -> str:
+    code = _SOURCE_CACHE.get(func)
+    if code is None:
+        code = _strip_decorator(inspect.getsource(func))
+        _SOURCE_CACHE[func] = code
+    return code
+
+
 def _to_code(func: Union[FunctionWithRequirements[T, P], Callable[P, T], FunctionWithRequirementsStr]) -> str:
     if isinstance(func, FunctionWithRequirementsStr):
         return func.func
+    if isinstance(func, FunctionWithRequirements):
+        return _callable_to_code(func.func)
 
-    code = inspect.getsource(func)
-    # Strip the decorator
-    if code.startswith("@"):
-        code = code[code.index("\n") + 1 :]
-    return code
+    return _callable_to_code(func)
 
 
+def _callable_to_code(func: Callable[..., Any]) -> str:
+    target = inspect.unwrap(func)
+    if inspect.isfunction(target):
+        return _stripped_source(target)
+
+    # Other callables (e.g. callable instances) are not guaranteed to hash by identity
+    return _strip_decorator(inspect.getsource(func))
+
+
+# Imports are immutable (str or frozen dataclasses) and usually shared across many functions.
+@functools.lru_cache(maxsize=1024)
 def _import_to_str(im: Import) -> str:
     if isinstance(im, str):
         return f"import {im}"
@@ -43,22 +82,16 @@ def _import_to_str(im: Import) -> str:
             else:
                 return f"{i.name} as {i.alias}"
 
-        imports = ", ".join(map(to_str, im.imports))
+        imports = ", ".join([to_str(i) for i in im.imports])
         return f"from {im.module} import {imports}"
 
 
-class _StringLoader(SourceLoader):
-    def __init__(self, data: str):
-        self.data = data
-
-    def get_source(self, fullname: str) -> str:
-        return self.data
-
-    def get_data(self, path: str) -> bytes:
-        return self.data.encode("utf-8")
+_COMPILED_FUNC_CACHE_MAXSIZE = 128
 
-    def get_filename(self, fullname: str) -> str:
-        return "<not a real path>/" + fullname + ".py"
+# Compiling and executing a snippet is only needed once per unique source. Instances built from the
+# same source share the compiled function and therefore its module globals.
+_COMPILED_FUNC_CACHE: OrderedDict[str, Tuple[CodeType, str, Callable[..., Any]]] = OrderedDict()
+_COMPILED_FUNC_CACHE_LOCK = threading.Lock()
 
 
 @dataclass
@@ -66,33 +99,47 @@ class FunctionWithRequirementsStr:
     func: str
     compiled_func: Callable[..., Any]
     _func_name: str
+    _code_obj: CodeType = field(repr=False)
     python_packages: Sequence[str] = field(default_factory=list)
     global_imports: Sequence[Import] = field(default_factory=list)
 
     def __init__(self, func: str, python_packages: Sequence[str] = [], global_imports: Sequence[Import] = []):
         self.func = func
-        self.python_packages = python_packages
-        self.global_imports = global_imports
+        self.python_packages = tuple(python_packages)
+        self.global_imports = tuple(global_imports)
 
-        module_name = "func_module"
-        loader = _StringLoader(func)
-        spec = spec_from_loader(module_name, loader)
-        if spec is None:
-            raise ValueError("Could not create spec")
-        module = module_from_spec(spec)
-        if spec.loader is None:
-            raise ValueError("Could not create loader")
+        with _COMPILED_FUNC_CACHE_LOCK:
+            cached = _COMPILED_FUNC_CACHE.get(func)
+            if cached is not None:
+                _COMPILED_FUNC_CACHE.move_to_end(func)
+                self._code_obj, self._func_name, self.compiled_func = cached
+                return
 
+        module_name = "func_module"
+        namespace: Dict[str, Any] = {"__name__": module_name}
         try:
-            spec.loader.exec_module(module)
+            # Keep the bytecode around so the snippet can be re-executed without parsing it again
+            self._code_obj = compile(func, f"<{module_name}>", "exec", dont_inherit=True)
+            exec(self._code_obj, namespace)
         except Exception as e:
             raise ValueError(f"Could not compile function: {e}") from e
 
-        functions = inspect.getmembers(module, inspect.isfunction)
-        if len(functions) != 1:
+        # Only consider functions defined by the snippet itself, not ones it imports.
+        # Stop scanning as soon as a second function shows up.
+        function: Optional[Tuple[str, Callable[..., Any]]] = None
+        for name, value in namespace.items():
+            if inspect.isfunction(value) and value.__module__ == module_name:
+                if function is not None:
+                    raise ValueError("The string must contain exactly one function")
+                function = (name, value)
+        if function is None:
             raise ValueError("The string must contain exactly one function")
 
-        self._func_name, self.compiled_func = functions[0]
+        self._func_name, self.compiled_func = function
+        with _COMPILED_FUNC_CACHE_LOCK:
+            _COMPILED_FUNC_CACHE[func] = (self._code_obj, self._func_name, self.compiled_func)
+            if len(_COMPILED_FUNC_CACHE) > _COMPILED_FUNC_CACHE_MAXSIZE:
+                _COMPILED_FUNC_CACHE.popitem(last=False)
 
     def __call__(self, *args: Any, **kwargs: Any) -> None:
         raise NotImplementedError("String based function with requirement objects are not directly callable")
@@ -104,6 +151,11 @@ class FunctionWithRequirements(Generic[T, P]):
     python_packages: Sequence[str] = field(default_factory=list)
     global_imports: Sequence[Import] = field(default_factory=list)
 
+    def __post_init__(self) -> None:
+        # Store requirements as tuples so callers can not mutate them behind the build cache
+        self.python_packages = tuple(self.python_packages)
+        self.global_imports = tuple(self.global_imports)
+
     @classmethod
     def from_callable(
         cls, func: Callable[P, T], python_packages: Sequence[str] = [], global_imports: Sequence[Import] = []
@@ -191,28 +243,91 @@ def with_requirements(
             python_packages=python_packages, global_imports=global_imports, func=func
         )
 
-        functools.update_wrapper(func_with_reqs, func)
+        # Only the attributes used for stubs and source lookup are copied, update_wrapper is not needed
+        func_with_reqs.__name__ = func.__name__  # type: ignore[attr-defined]
+        func_with_reqs.__doc__ = func.__doc__
+        func_with_reqs.__wrapped__ = func  # type: ignore[attr-defined]
         return func_with_reqs
 
     return wrapper
 
 
+_BUILD_CACHE_MAXSIZE = 128
+
+# Maps the identity of a function list, including the callable or source each wrapper currently
+# holds, to those objects and the generated file content, both as text and UTF-8 encoded. Holding on
+# to the objects keeps them alive so that their ids can not be reused by other objects. Reassigning
+# the `func` of a registered wrapper therefore produces a new key.
+_BUILD_CACHE: OrderedDict[Tuple[Any, ...], Tuple[Tuple[Any, ...], str, bytes]] = OrderedDict()
+_BUILD_CACHE_LOCK = threading.Lock()
+
+
+def _build_cache_key(
+    funcs: Sequence[Union[FunctionWithRequirements[Any, P], Callable[..., Any], FunctionWithRequirementsStr]],
+) -> Tuple[Any, ...]:
+    return tuple(
+        (
+            id(f),
+            id(getattr(f, "func", f)),
+            tuple(getattr(f, "python_packages", ())),
+            tuple(getattr(f, "global_imports", ())),
+        )
+        for f in funcs
+    )
+
+
+def build_python_functions_file_contents(
+    funcs: Sequence[Union[FunctionWithRequirements[Any, P], Callable[..., Any], FunctionWithRequirementsStr]],
+) -> Tuple[str, bytes]:
+    """:meta private:"""
+    key = _build_cache_key(funcs)
+    with _BUILD_CACHE_LOCK:
+        cached = _BUILD_CACHE.get(key)
+        if cached is not None:
+            _BUILD_CACHE.move_to_end(key)
+            return cached[1], cached[2]
+
+    # Build outside of the lock, reading sources can be slow
+    content = _build_python_functions_file(funcs)
+    content_bytes = content.encode("utf-8")
+    with _BUILD_CACHE_LOCK:
+        _BUILD_CACHE[key] = (tuple((f, getattr(f, "func", f)) for f in funcs), content, content_bytes)
+        if len(_BUILD_CACHE) > _BUILD_CACHE_MAXSIZE:
+            _BUILD_CACHE.popitem(last=False)
+    return content, content_bytes
+
+
 def build_python_functions_file(
     funcs: Sequence[Union[FunctionWithRequirements[Any, P], Callable[..., Any], FunctionWithRequirementsStr]],
 ) -> str:
     """:meta private:"""
-    # First collect all global imports
-    global_imports: Set[Import] = set()
-    for func in funcs:
-        if isinstance(func, (FunctionWithRequirements, FunctionWithRequirementsStr)):
-            global_imports.update(func.global_imports)
+    return build_python_functions_file_contents(funcs)[0]
+
+
+def _clear_build_cache() -> None:
+    """Invalidate the memoized output of `build_python_functions_file`."""
+    with _BUILD_CACHE_LOCK:
+        _BUILD_CACHE.clear()
+
 
-    content = "\n".join(map(_import_to_str, global_imports)) + "\n\n"
+build_python_functions_file.cache_clear = _clear_build_cache  # type: ignore[attr-defined]
+build_python_functions_file_contents.cache_clear = _clear_build_cache  # type: ignore[attr-defined]
 
+
+def _build_python_functions_file(
+    funcs: Sequence[Union[FunctionWithRequirements[Any, P], Callable[..., Any], FunctionWithRequirementsStr]],
+) -> str:
+    # Collect the global imports and the function sources in a single pass. Both are deduplicated
+    # on their rendered form in a stable order, so a function registered twice is only emitted once.
+    global_imports: Dict[str, None] = {}
+    code_parts: Dict[str, None] = {}
     for func in funcs:
-        content += _to_code(func) + "\n\n"
+        if isinstance(func, (FunctionWithRequirements, FunctionWithRequirementsStr)):
+            for im in func.global_imports:
+                global_imports.setdefault(_import_to_str(im))
+        code_parts.setdefault(_to_code(func))
 
-    return content
+    return "\n\n".join(["\n".join(global_imports), *code_parts]) + "\n\n"
 
 
 def to_stub(func: Union[Callable[..., Any], FunctionWithRequirementsStr]) -> str:
@@ -225,8 +340,22 @@ def to_stub(func: Union[Callable[..., Any], FunctionWithRequirementsStr]) -> str
         str: The stub for the function
     """
     if isinstance(func, FunctionWithRequirementsStr):
-        return to_stub(func.compiled_func)
+        func = func.compiled_func
+    elif isinstance(func, FunctionWithRequirements):
+        # The wrapper is an unhashable dataclass, the stub only depends on the wrapped function
+        func = func.func
+
+    if isinstance(func, Hashable):
+        return _to_stub_cached(func)
+    return _to_stub(func)
+
+
+@functools.lru_cache(maxsize=256)
+def _to_stub_cached(func: Callable[..., Any]) -> str:
+    return _to_stub(func)
+
 
+def _to_stub(func: Callable[..., Any]) -> str:
     content = f"def {func.__name__}{inspect.signature(func)}:\n"
     docstring = func.__doc__
 
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List, Optional, Tuple, Union
+from typing import Optional, Sequence, Tuple, Union
 
 
 @dataclass
@@ -40,13 +40,11 @@ class ImportFromModule:
     def __init__(
         self,
         module: str,
-        imports: Union[Tuple[Union[str, Alias], ...], List[Union[str, Alias]]],
+        imports: Sequence[Union[str, Alias]],
     ):
         object.__setattr__(self, "module", module)
-        if isinstance(imports, list):
-            object.__setattr__(self, "imports", tuple(imports))
-        else:
-            object.__setattr__(self, "imports", imports)
+        # Always store a tuple so that instances stay hashable
+        object.__setattr__(self, "imports", tuple(imports))
 
 
 Import = Union[str, ImportFromModule, Alias]
@@ -1,9 +1,7 @@
 import re
 import shutil
 from pathlib import Path
-from typing import Optional, TypeVar
-
-from typing_extensions import ParamSpec
+from typing import Optional, ParamSpec, TypeVar
 
 from ._types import Import
 